@@ -43,12 +43,26 @@ TXT2NLU_MODEL_INFO = get_sagemaker_uris(model_id=TXT2NLU_MODEL_ID,
                                         model_version=TXT2NLU_MODEL_VERSION,
                                         region_name=region_name)
 
+#Copy the model artifacts into a bucket owned by the project at deploy time, so that new
+#endpoint instances download them from there instead of the JumpStart bucket
+STAGE_MODEL_ARTIFACTS = False
+
+#Web application auto scaling targets (per task)
+WEB_MAX_TASK_COUNT = 10
+WEB_SESSIONS_PER_TASK = 20           # active Streamlit sessions
+WEB_IN_FLIGHT_REQUESTS_PER_TASK = 8  # inference requests waiting on API Gateway
+WEB_REQUESTS_PER_TARGET = 200        # ALB requests per minute
+
 app = cdk.App()
 
 network_stack = GenerativeAiVpcNetworkStack(app, "GenerativeAiVpcNetworkStack", env=env)
-GenerativeAiDemoWebStack(app, "GenerativeAiDemoWebStack", vpc=network_stack.vpc, env=env)
+GenerativeAiDemoWebStack(app, "GenerativeAiDemoWebStack", vpc=network_stack.vpc, env=env,
+                         max_task_count=WEB_MAX_TASK_COUNT,
+                         sessions_per_task=WEB_SESSIONS_PER_TASK,
+                         in_flight_requests_per_task=WEB_IN_FLIGHT_REQUESTS_PER_TASK,
+                         requests_per_target=WEB_REQUESTS_PER_TARGET)
 
-GenerativeAiTxt2nluSagemakerStack(app, "GenerativeAiTxt2nluSagemakerStack", env=env, model_info=TXT2NLU_MODEL_INFO)
-GenerativeAiTxt2imgSagemakerStack(app, "GenerativeAiTxt2imgSagemakerStack", env=env, model_info=TXT2IMG_MODEL_INFO)
+GenerativeAiTxt2nluSagemakerStack(app, "GenerativeAiTxt2nluSagemakerStack", env=env, model_info=TXT2NLU_MODEL_INFO, stage_model_artifacts=STAGE_MODEL_ARTIFACTS)
+GenerativeAiTxt2imgSagemakerStack(app, "GenerativeAiTxt2imgSagemakerStack", env=env, model_info=TXT2IMG_MODEL_INFO, stage_model_artifacts=STAGE_MODEL_ARTIFACTS)
 
 app.synth()
@@ -0,0 +1,73 @@
+import os
+import statistics
+import time
+import boto3
+
+runtime = boto3.client('runtime.sagemaker')
+cloudwatch = boto3.client('cloudwatch')
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'GenerativeAiDemo/Endpoints')
+
+
+def invoke(endpoint_name, request):
+    # request holds invoke_endpoint arguments, e.g. ContentType, Accept and Body
+    start = time.time()
+    response = runtime.invoke_endpoint(EndpointName=endpoint_name, **request)
+    response['Body'].read()
+    return (time.time() - start) * 1000
+
+
+def put_latency_metric(endpoint_name, metric_name, latencies):
+    cloudwatch.put_metric_data(
+        Namespace=METRICS_NAMESPACE,
+        MetricData=[{
+            "MetricName": metric_name,
+            "Dimensions": [{"Name": "EndpointName", "Value": endpoint_name}],
+            "Values": latencies,
+            "Unit": "Milliseconds"
+        }]
+    )
+
+
+def warm_up(endpoint_name, requests):
+    # The first request pays for loading the weights onto the GPU, compiling kernels and
+    # warming up the container, the following ones show the steady-state latency
+    latencies = [invoke(endpoint_name, request) for request in requests]
+    first_inference = latencies[0]
+    steady_state = statistics.median(latencies[1:]) if len(latencies) > 1 else None
+
+    put_latency_metric(endpoint_name, "FirstInferenceLatency", [first_inference])
+    if steady_state is not None:
+        put_latency_metric(endpoint_name, "SteadyStateLatency", latencies[1:])
+
+    data = {
+        "FirstInferenceMs": str(round(first_inference)),
+        "SteadyStateMs": str(round(steady_state)) if steady_state is not None else "n/a"
+    }
+    print(f"Warmed up {endpoint_name}: {data}")
+    return data
+
+
+def lambda_handler(event, context):
+    # Scheduled keep-warm invocation
+    if 'RequestType' not in event:
+        latency = invoke(event['EndpointName'], event['Request'])
+        put_latency_metric(event['EndpointName'], "KeepWarmLatency", [latency])
+        return {"KeepWarmMs": round(latency)}
+
+    # Custom resource event, sent once the endpoint is InService
+    properties = event['ResourceProperties']
+    endpoint_name = properties['EndpointName']
+    physical_id = f"{endpoint_name}-warmup"
+
+    if event['RequestType'] == 'Delete':
+        return {"PhysicalResourceId": physical_id}
+
+    # Warming up is best effort, a failure must not roll back the endpoint
+    try:
+        data = warm_up(endpoint_name, properties['Requests'])
+    except Exception as e:
+        print(f"Warm-up of {endpoint_name} failed: {e}")
+        data = {"FirstInferenceMs": "failed", "SteadyStateMs": "failed"}
+
+    return {"PhysicalResourceId": physical_id, "Data": data}
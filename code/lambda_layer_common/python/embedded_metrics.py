@@ -0,0 +1,22 @@
+import json
+import time
+
+
+def put_metrics(namespace, dimensions, metrics):
+    """
+    Publishes metrics by logging them in the CloudWatch embedded metric format, which costs
+    no API call on the request path. metrics maps a metric name to a (value, unit) tuple.
+    """
+    record = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": namespace,
+                "Dimensions": [list(dimensions)],
+                "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in metrics.items()],
+            }],
+        },
+        **dimensions,
+        **{name: value for name, (value, _) in metrics.items()},
+    }
+    print(json.dumps(record))
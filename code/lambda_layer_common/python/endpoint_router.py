@@ -0,0 +1,198 @@
+import os
+import random
+import re
+import threading
+import time
+
+import boto3
+from botocore.exceptions import ClientError, ConnectionError, ReadTimeoutError
+
+POOL_CACHE_TTL = float(os.environ.get("POOL_CACHE_TTL", "60"))       # seconds a pool read from SSM is reused
+LATENCY_EWMA_ALPHA = float(os.environ.get("LATENCY_EWMA_ALPHA", "0.3"))
+LATENCY_STALE_SECONDS = float(os.environ.get("LATENCY_STALE_SECONDS", "60"))  # older latencies are forgotten
+EJECT_AFTER_ERRORS = int(os.environ.get("EJECT_AFTER_ERRORS", "3"))  # consecutive errors before an endpoint is ejected
+EJECT_SECONDS = float(os.environ.get("EJECT_SECONDS", "30"))          # how long an ejected endpoint is skipped
+
+MODEL_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+ENDPOINT_ERROR_CODES = {"ThrottlingException", "ServiceUnavailable", "InternalFailure"}
+
+
+class UnknownModelError(ValueError):
+    pass
+
+
+def get_parameter(name, ssm_client):
+    """
+    Reads a value from Systems Manager's Parameter Store. An environment variable
+    with the upper-cased parameter name takes precedence, which allows running
+    without SSM.
+    """
+    override = os.environ.get(name.upper())
+    if override is not None:
+        return override
+
+    response = ssm_client.get_parameter(Name=name)
+    return response["Parameter"]["Value"]
+
+
+def is_endpoint_failure(error):
+    """
+    Tells whether an invoke_endpoint error says something about the health of the endpoint
+    (throttling, 5xx, timeouts) rather than about the request (e.g. a bad payload).
+    """
+    if isinstance(error, (ConnectionError, ReadTimeoutError)):
+        return True
+    if not isinstance(error, ClientError):
+        return False
+
+    response = error.response
+    if response.get("Error", {}).get("Code") in ENDPOINT_ERROR_CODES:
+        return True
+    # ModelError wraps the status code returned by the model container
+    status_code = response.get("OriginalStatusCode") or response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+    return status_code == 429 or status_code >= 500
+
+
+class EndpointStats:
+    """
+    Per-endpoint load and health as seen from this Lambda execution environment.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.latency_ewma = None
+        self.latency_updated = 0.0
+        self.consecutive_errors = 0
+        self.ejected_until = 0.0
+
+    def is_ejected(self, now):
+        return self.ejected_until > now
+
+    def latency(self, now):
+        if self.latency_ewma is None or now - self.latency_updated > LATENCY_STALE_SECONDS:
+            return None
+        return self.latency_ewma
+
+
+class EndpointRouter:
+    """
+    Routes a logical model name (e.g. "txt2nlu") to one endpoint of a pool.
+
+    The pool is read from the SSM parameter "<model>_sm_endpoint_pool" (a comma
+    separated list of endpoint names) and falls back to the single endpoint in
+    "<model>_sm_endpoint". Only the models passed to the router can be routed.
+
+    Each Lambda execution environment only sees its own requests, so the endpoint
+    is picked at random, weighted by the inverse of its recent latency times its
+    in-flight requests. Slower endpoints still get a share of the traffic, and a
+    latency older than LATENCY_STALE_SECONDS is replaced by the pool average so
+    that endpoints that recovered are probed again. Endpoints that keep failing
+    are ejected for EJECT_SECONDS.
+    """
+
+    def __init__(self, models, ssm_client=None, rng=None):
+        self._models = set(models)
+        self._ssm_client = ssm_client or boto3.client("ssm")
+        self._random = rng or random.Random()
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._stats = {}
+
+    def get_pool(self, model):
+        if model not in self._models or not MODEL_NAME_PATTERN.match(model):
+            raise UnknownModelError(f"Unknown model '{model}', expected one of {sorted(self._models)}")
+
+        now = time.time()
+        cached = self._pools.get(model)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        try:
+            value = get_parameter(f"{model}_sm_endpoint_pool", self._ssm_client)
+        except self._ssm_client.exceptions.ParameterNotFound:
+            try:
+                value = get_parameter(f"{model}_sm_endpoint", self._ssm_client)
+            except self._ssm_client.exceptions.ParameterNotFound:
+                raise UnknownModelError(f"No endpoints configured for model '{model}'")
+
+        pool = [name.strip() for name in value.split(",") if name.strip()]
+        if not pool:
+            raise UnknownModelError(f"No endpoints configured for model '{model}'")
+
+        self._pools[model] = (pool, now + POOL_CACHE_TTL)
+        return pool
+
+    def choose(self, model, exclude=()):
+        """
+        Picks an endpoint of the pool and counts the request as in flight. Every
+        call must be paired with a call to release() or abandon().
+        """
+        pool = [name for name in self.get_pool(model) if name not in exclude]
+        if not pool:
+            return None
+
+        now = time.time()
+        with self._lock:
+            stats = {name: self._stats.setdefault(name, EndpointStats()) for name in pool}
+            healthy = [name for name in pool if not stats[name].is_ejected(now)]
+
+            if healthy:
+                known = [stats[name].latency(now) for name in healthy if stats[name].latency(now) is not None]
+                default_latency = sum(known) / len(known) if known else 1.0
+                weights = [1.0 / ((stats[name].in_flight + 1) * max(stats[name].latency(now) or default_latency, 0.001))
+                           for name in healthy]
+                endpoint_name = self._random.choices(healthy, weights=weights)[0]
+            else:
+                # Every endpoint is ejected, fail open on the one that recovers first
+                endpoint_name = min(pool, key=lambda name: stats[name].ejected_until)
+
+            stats[endpoint_name].in_flight += 1
+
+        return endpoint_name
+
+    def release(self, endpoint_name, latency, error=None):
+        """
+        Records the outcome of a call. Errors only count towards ejection when they
+        are endpoint failures, a bad request does not make an endpoint unhealthy.
+        """
+        now = time.time()
+        with self._lock:
+            stats = self._stats.setdefault(endpoint_name, EndpointStats())
+            stats.in_flight = max(stats.in_flight - 1, 0)
+
+            if error is None:
+                stats.consecutive_errors = 0
+                stats.ejected_until = 0.0
+                if stats.latency(now) is None:
+                    stats.latency_ewma = latency
+                else:
+                    stats.latency_ewma += LATENCY_EWMA_ALPHA * (latency - stats.latency_ewma)
+                stats.latency_updated = now
+            elif is_endpoint_failure(error):
+                stats.consecutive_errors += 1
+                if stats.consecutive_errors >= EJECT_AFTER_ERRORS:
+                    stats.ejected_until = now + EJECT_SECONDS
+
+    def abandon(self, endpoint_name):
+        """
+        Releases a call whose result was not used without recording its outcome. Its
+        latency or error may include time the execution environment was frozen.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(endpoint_name, EndpointStats())
+            stats.in_flight = max(stats.in_flight - 1, 0)
+
+    def invoke(self, model, call):
+        """
+        Calls call(endpoint_name) on the endpoint chosen for the model and records
+        its outcome. Returns the endpoint name and the result of the call.
+        """
+        endpoint_name = self.choose(model)
+        start = time.time()
+        try:
+            result = call(endpoint_name)
+        except Exception as e:
+            self.release(endpoint_name, time.time() - start, e)
+            raise
+        self.release(endpoint_name, time.time() - start)
+        return endpoint_name, result
@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "95"))      # latency percentile after which a hedge is sent
+HEDGE_DEFAULT_DELAY = float(os.environ.get("HEDGE_DEFAULT_DELAY", "10"))  # seconds, until enough latencies are known
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MAX_RATE = float(os.environ.get("HEDGE_MAX_RATE", "0.1"))          # share of requests that may be hedged
+HEDGE_WINDOW = 200                                                        # recent requests the percentile and budget are based on
+
+
+class HedgedInvoker:
+    """
+    Sends a duplicate of a slow request to an alternate endpoint of the pool, or to an alternate
+    variant of the same endpoint, and returns whichever response succeeds first.
+
+    A request is hedged once it has been outstanding for longer than HEDGE_PERCENTILE of the recent
+    latencies of the same model and profile, as profiles with different decode budgets have different
+    latencies. Hedges are limited to a budget of HEDGE_MAX_RATE * HEDGE_WINDOW among the last
+    HEDGE_WINDOW requests so that a slow endpoint does not get twice the load. The budget is
+    available from the first request, a new execution environment can hedge right away.
+
+    The losing call is abandoned: its result is ignored, and it counts as in flight for the router
+    until it returns. Lambda freezes the execution environment after the response, so the losing
+    call may only return on a later invocation. Its latency and errors are therefore not recorded.
+    """
+
+    def __init__(self, router, target_variants=()):
+        self._router = router
+        self._target_variants = list(target_variants)
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._hedged = deque(maxlen=HEDGE_WINDOW)
+        self._hedge_budget = int(HEDGE_MAX_RATE * HEDGE_WINDOW)
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+    def hedge_delay(self, model, profile=None):
+        with self._lock:
+            latencies = sorted(self._latencies.get((model, profile), ()))
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return latencies[min(int(len(latencies) * HEDGE_PERCENTILE / 100), len(latencies) - 1)]
+
+    def _allow_hedge(self):
+        with self._lock:
+            return sum(self._hedged) < self._hedge_budget
+
+    def _alternate(self, model, primary):
+        alternate = self._router.choose(model, exclude=(primary,))
+        if alternate is not None:
+            return alternate, None
+        if self._target_variants:
+            self._router.choose(model)  # the same endpoint, counted as in flight once more
+            return primary, self._target_variants[0]
+        return None
+
+    def _run(self, call, endpoint_name, target_variant, key, abandoned):
+        start = time.time()
+        try:
+            result = call(endpoint_name, target_variant)
+        except Exception as e:
+            if abandoned.is_set():
+                self._router.abandon(endpoint_name)
+            else:
+                self._router.release(endpoint_name, time.time() - start, e)
+            raise
+
+        latency = time.time() - start
+        if abandoned.is_set():
+            self._router.abandon(endpoint_name)
+            return result, latency
+
+        self._router.release(endpoint_name, latency)
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=HEDGE_WINDOW)).append(latency)
+        return result, latency
+
+    def invoke(self, model, call, profile=None):
+        """
+        Calls call(endpoint_name, target_variant) on the endpoint chosen for the model, and once more on
+        an alternate if the first call is slow. Returns the winning endpoint name, the result of its call
+        and stats about the hedge: the latency of the winning call and, if the hedge won, how long the
+        request waited before the hedge was sent.
+        """
+        key = (model, profile)
+        delay = self.hedge_delay(model, profile)
+        primary = self._router.choose(model)
+        abandoned = threading.Event()  # set once a call won, for the other call
+        start = time.time()
+        futures = {self._executor.submit(self._run, call, primary, None, key, abandoned): primary}
+        stats = {"hedged": False, "hedge_won": False, "hedge_suppressed": False, "latency": None, "hedge_delay": 0.0}
+
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            if self._allow_hedge():
+                alternate = self._alternate(model, primary)
+                if alternate is not None:
+                    stats["hedge_delay"] = time.time() - start
+                    futures[self._executor.submit(self._run, call, *alternate, key, abandoned)] = alternate[0]
+                    stats["hedged"] = True
+            else:
+                stats["hedge_suppressed"] = True
+
+        with self._lock:
+            self._hedged.append(stats["hedged"])
+
+        errors = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    abandoned.set()
+                    result, stats["latency"] = future.result()
+                    stats["hedge_won"] = stats["hedged"] and next(iter(futures)) is not future
+                    if not stats["hedge_won"]:
+                        stats["hedge_delay"] = 0.0
+                    return futures[future], result, stats
+                errors.append(future.exception())
+
+        raise errors[0]
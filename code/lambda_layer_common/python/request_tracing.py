@@ -0,0 +1,80 @@
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+TRACE_HEADER = "X-Trace-Id"
+TRACE_ID_PATTERN = re.compile(r"[0-9A-Za-z-]{1,64}")  # the trace ID is passed to SageMaker, which only accepts ASCII
+
+_cold_start = True
+
+
+def _milliseconds(seconds):
+    return round(seconds * 1000, 1)
+
+
+class RequestTrace:
+    """
+    Collects per-hop timings of one API Gateway request handled by a Lambda function.
+
+    The trace ID is taken from the X-Trace-Id request header, or generated if the header
+    is missing or not a short alphanumeric ID, and the timings are returned to the caller
+    in the standard Server-Timing header.
+
+    init_start is the time the handler module started loading, recorded before its
+    first import. On a cold start, the time from there to the first request is
+    reported as the init phase.
+    """
+
+    def __init__(self, event, init_start=None):
+        global _cold_start
+
+        self.start = time.time()
+        self.timings = {}
+
+        headers = {name.lower(): value for name, value in (event.get("headers") or {}).items()}
+        trace_id = headers.get(TRACE_HEADER.lower()) or ""
+        self.trace_id = trace_id if TRACE_ID_PATTERN.fullmatch(trace_id) else uuid.uuid4().hex
+
+        init = 0.0
+        if _cold_start:
+            _cold_start = False
+            if init_start is not None:
+                init = self.start - init_start
+                self.timings["lambda_init"] = _milliseconds(init)
+
+        # requestTimeEpoch is when API Gateway received the request, so this covers API Gateway
+        # and the Lambda invoke, minus the init phase reported above
+        request_time = (event.get("requestContext") or {}).get("requestTimeEpoch")
+        if request_time:
+            self.timings["apigw_to_lambda"] = max(round(_milliseconds(self.start - init) - request_time, 1), 0.0)
+
+    @property
+    def custom_attributes(self):
+        """
+        Value for the CustomAttributes parameter of invoke_endpoint.
+        """
+        return f"trace_id={self.trace_id}"
+
+    @contextmanager
+    def hop(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(self.timings.get(name, 0.0) + _milliseconds(time.time() - start), 1)
+
+    def record(self, name, seconds):
+        """
+        Records a hop timed elsewhere, e.g. by a call that ran on another thread.
+        """
+        self.timings[name] = _milliseconds(seconds)
+
+    def headers(self):
+        self.timings["lambda_total"] = _milliseconds(time.time() - self.start)
+        server_timing = ", ".join(f"{name};dur={duration}" for name, duration in self.timings.items())
+
+        return {
+            TRACE_HEADER: self.trace_id,
+            "Server-Timing": server_timing,
+        }
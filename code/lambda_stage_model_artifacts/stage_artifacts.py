@@ -0,0 +1,72 @@
+import time
+import boto3
+from boto3.s3.transfer import TransferConfig
+from concurrent.futures import ThreadPoolExecutor
+
+s3 = boto3.client('s3')
+
+MAX_WORKERS = 16
+TRANSFER_CONFIG = TransferConfig(multipart_chunksize=256 * 1024 * 1024, max_concurrency=8)
+TIME_MARGIN = 5 * 60  # seconds left for the last batch of copies before the Lambda timeout
+
+
+def list_objects(bucket, prefix):
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        yield from page.get('Contents', [])
+
+
+def copy_object(source_bucket, source_object, target_bucket, target_key):
+    # Server-side copy, the data does not go through the Lambda function
+    s3.copy({'Bucket': source_bucket, 'Key': source_object['Key']}, target_bucket, target_key, Config=TRANSFER_CONFIG)
+    return source_object['Size']
+
+
+def stage(source_bucket, source_prefix, target_bucket, target_prefix, deadline):
+    """
+    Copies the objects that are not staged yet, in batches, until the deadline. Returns
+    whether every object is staged.
+    """
+    start = time.time()
+    objects = list(list_objects(source_bucket, source_prefix))
+    if not objects:
+        raise ValueError(f"No model artifacts under s3://{source_bucket}/{source_prefix}")
+
+    # Skip objects staged by a previous invocation or deployment
+    staged = {staged_object['Key']: staged_object['Size'] for staged_object in list_objects(target_bucket, target_prefix)}
+    missing = [source_object for source_object in objects
+               if staged.get(target_prefix + source_object['Key'][len(source_prefix):]) != source_object['Size']]
+
+    copied = 0
+    remaining = list(missing)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        while remaining and time.time() < deadline:
+            batch, remaining = remaining[:MAX_WORKERS], remaining[MAX_WORKERS:]
+            copied += sum(executor.map(
+                lambda source_object: copy_object(source_bucket, source_object, target_bucket,
+                                                  target_prefix + source_object['Key'][len(source_prefix):]),
+                batch))
+
+    print(f"Staged {len(objects) - len(remaining)} of {len(objects)} objects ({copied / 1024 ** 3:.2f} GiB copied) "
+          f"from s3://{source_bucket}/{source_prefix} to s3://{target_bucket}/{target_prefix} in {time.time() - start:.0f} s")
+    return not remaining
+
+
+def on_event(event, context):
+    properties = event['ResourceProperties']
+    return {"PhysicalResourceId": f"s3://{properties['TargetBucket']}/{properties['TargetPrefix']}"}
+
+
+def is_complete(event, context):
+    properties = event['ResourceProperties']
+
+    # The staged objects are removed together with the bucket
+    if event['RequestType'] == 'Delete':
+        return {"IsComplete": True}
+
+    deadline = time.time() + context.get_remaining_time_in_millis() / 1000 - TIME_MARGIN
+    if not stage(properties['SourceBucket'], properties['SourcePrefix'],
+                 properties['TargetBucket'], properties['TargetPrefix'], deadline):
+        return {"IsComplete": False}
+
+    return {"IsComplete": True, "Data": {"TargetBucket": properties['TargetBucket']}}
@@ -1,26 +1,68 @@
+import time
+INIT_START = time.time()  # first statement, so the init phase includes the imports below
+
 import json
+import os
 import boto3
+from endpoint_router import EndpointRouter, UnknownModelError
+from request_tracing import RequestTrace
+
+DEFAULT_MODEL = os.environ.get('DEFAULT_MODEL', 'txt2img')
+MODELS = os.environ.get('MODELS', DEFAULT_MODEL).split(',')
+
 runtime= boto3.client('runtime.sagemaker') 
+router = EndpointRouter(MODELS)
+
+
+def bad_request(message, trace):
+    return {
+        "statusCode": 400,
+        "body": json.dumps({"message": message}),
+        "headers": {
+            "Content-Type": "application/json",
+            **trace.headers()
+        }
+    }
 
 
 def lambda_handler(event, context):
+    trace = RequestTrace(event, init_start=INIT_START)
     body = json.loads(event['body'])
     prompt = body['prompt']
-    endpoint_name = body['endpoint_name']
     
-    response = runtime.invoke_endpoint(EndpointName=endpoint_name, 
-                                      Body=prompt, 
-                                      ContentType='application/x-text')    
+    def invoke(endpoint_name):
+        with trace.hop('sagemaker_invoke'):
+            return runtime.invoke_endpoint(EndpointName=endpoint_name, 
+                                           Body=prompt, 
+                                           ContentType='application/x-text',
+                                           CustomAttributes=trace.custom_attributes)
     
-    response_body = json.loads(response['Body'].read().decode())
+    # An explicit endpoint name bypasses routing across the model's endpoint pool
+    if body.get('endpoint_name'):
+        endpoint_name = body['endpoint_name']
+        response = invoke(endpoint_name)
+    else:
+        try:
+            endpoint_name, response = router.invoke(body.get('model', DEFAULT_MODEL), invoke)
+        except UnknownModelError as e:
+            return bad_request(str(e), trace)
+    
+    with trace.hop('sagemaker_read'):
+        response_body = response['Body'].read()
+    with trace.hop('json_decode'):
+        response_body = json.loads(response_body.decode())
     generated_image = response_body['generated_image']
     
-    message = {"prompt": prompt,'image':generated_image}
+    message = {"prompt": prompt,'image':generated_image, "endpoint_name": endpoint_name}
+    
+    with trace.hop('json_encode'):
+        response_body = json.dumps(message)
     
     return {
         "statusCode": 200,
-        "body": json.dumps(message),
+        "body": response_body,
         "headers": {
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            **trace.headers()
         }
     }
\ No newline at end of file
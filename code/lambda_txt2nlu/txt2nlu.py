@@ -1,7 +1,23 @@
+import time
+INIT_START = time.time()  # first statement, so the init phase includes the imports below
+
 import json
+import os
 import boto3
+from embedded_metrics import put_metrics
+from endpoint_router import EndpointRouter, UnknownModelError
+from hedging import HedgedInvoker
+from request_tracing import RequestTrace
+
+DEFAULT_MODEL = os.environ.get('DEFAULT_MODEL', 'txt2nlu')
+MODELS = os.environ.get('MODELS', DEFAULT_MODEL).split(',')
 
 runtime = boto3.client('runtime.sagemaker') 
+router = EndpointRouter(MODELS)
+HEDGE_ENABLED = os.environ.get('HEDGE_ENABLED', 'false').lower() == 'true'
+HEDGE_TARGET_VARIANTS = [name for name in os.environ.get('HEDGE_TARGET_VARIANTS', '').split(',') if name]
+
+hedged_invoker = HedgedInvoker(router, target_variants=HEDGE_TARGET_VARIANTS)
 
 MAX_LENGTH = 512
 NUM_RETURN_SEQUENCES = 1
@@ -10,6 +26,32 @@ TOP_P = 0.8
 DO_SAMPLE = True 
 MAX_TOTAL_TOKENS = 512  # Maximum total tokens allowed by the model
 MAX_CHARACTERS = 1700   # Maximum characters allowed in input
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'GenerativeAiDemo/Inference')
+
+# Generation profiles size the decode budget to the kind of query. Short answers such as a
+# sentiment or a list of steps are decoded greedily with a few tokens instead of sampling up
+# to MAX_LENGTH tokens. Stop sequences trim the generated text, they do not shorten decoding,
+# which is bounded by max_new_tokens. FLAN-T5 has no newline token, so the stop sequences are
+# strings the model can produce, such as the end of a sentence.
+GENERATION_PROFILES = {
+    "summary": {
+        "parameters": {"max_new_tokens": 150, "do_sample": True, "top_k": TOP_K, "top_p": TOP_P},
+        "stop": [],
+    },
+    "extraction": {
+        "parameters": {"max_new_tokens": 100, "do_sample": False},
+        "stop": [],
+    },
+    "classification": {
+        "parameters": {"max_new_tokens": 32, "do_sample": False},
+        "stop": [". "],
+    },
+    "free_form": {
+        "parameters": {"max_length": MAX_LENGTH, "do_sample": DO_SAMPLE, "top_k": TOP_K, "top_p": TOP_P},
+        "stop": [],
+    },
+}
+DEFAULT_PROFILE = "free_form"
 
 def truncate_input(prompt, max_tokens):
     # Truncate to MAX_CHARACTERS if the input is longer
@@ -17,10 +59,33 @@ def truncate_input(prompt, max_tokens):
         return prompt[:MAX_CHARACTERS]
     return prompt
 
+def apply_stop_sequences(text, stop):
+    # Cut the text at the first stop sequence, if any
+    text = text.strip()
+    for sequence in stop:
+        index = text.find(sequence)
+        if index >= 0:
+            text = text[:index]
+    return text.strip()
+
+def bad_request(message, trace):
+    return {
+        "statusCode": 400,
+        "body": json.dumps({"message": message}),
+        "headers": {
+            "Content-Type": "application/json",
+            **trace.headers()
+        }
+    }
+
 def lambda_handler(event, context):
+    trace = RequestTrace(event, init_start=INIT_START)
     body = json.loads(event['body'])
     prompt = body['prompt']
-    endpoint_name = body['endpoint_name']
+    profile_name = body.get('profile', DEFAULT_PROFILE)
+    if profile_name not in GENERATION_PROFILES:
+        return bad_request(f"Unknown profile '{profile_name}', expected one of {list(GENERATION_PROFILES)}", trace)
+    profile = GENERATION_PROFILES[profile_name]
     
     # Truncate input if necessary
     max_input_tokens = MAX_TOTAL_TOKENS - MAX_LENGTH
@@ -29,33 +94,74 @@ def lambda_handler(event, context):
     payload = {
         "inputs": truncated_prompt,
         "parameters":{
-               "max_length": MAX_LENGTH, 
                "num_return_sequences": NUM_RETURN_SEQUENCES,
-               "top_k": TOP_K,
-               "top_p": TOP_P,
-               "do_sample": DO_SAMPLE
+               **profile["parameters"]
         }
     }       
     payload = json.dumps(payload).encode('utf-8')
     
-    response = runtime.invoke_endpoint(EndpointName=endpoint_name, 
-                                  ContentType= 'application/json', 
-                                  Body=payload)
+    def invoke(endpoint_name, target_variant=None):
+        variant = {'TargetVariant': target_variant} if target_variant else {}
+        return runtime.invoke_endpoint(EndpointName=endpoint_name, 
+                                       ContentType= 'application/json', 
+                                       Body=payload,
+                                       CustomAttributes=trace.custom_attributes,
+                                       **variant)
+    
+    def timed_invoke(endpoint_name):
+        with trace.hop('sagemaker_invoke'):
+            return invoke(endpoint_name)
     
-    model_predictions = json.loads(response['Body'].read())
-    generated_text = model_predictions[0]['generated_text']
+    model = body.get('model', DEFAULT_MODEL)
+    hedge_stats = None
+    try:
+        # An explicit endpoint name bypasses routing across the model's endpoint pool, and hedging
+        if body.get('endpoint_name'):
+            endpoint_name = body['endpoint_name']
+            response = timed_invoke(endpoint_name)
+        elif body.get('hedge', HEDGE_ENABLED):
+            endpoint_name, response, hedge_stats = hedged_invoker.invoke(model, invoke, profile=profile_name)
+            # The hedged calls overlap, so only the winning call and the wait before it are recorded
+            trace.record('sagemaker_invoke', hedge_stats["latency"])
+            if hedge_stats["hedge_won"]:
+                trace.record('hedge_delay', hedge_stats["hedge_delay"])
+        else:
+            endpoint_name, response = router.invoke(model, timed_invoke)
+    except UnknownModelError as e:
+        return bad_request(str(e), trace)
+    
+    with trace.hop('sagemaker_read'):
+        response_body = response['Body'].read()
+    with trace.hop('json_decode'):
+        model_predictions = json.loads(response_body)
+    generated_text = apply_stop_sequences(model_predictions[0]['generated_text'], profile["stop"])
+    
+    put_metrics(METRICS_NAMESPACE, {"Profile": profile_name},
+                {"InferenceLatency": (trace.timings['sagemaker_invoke'], "Milliseconds")})
+    if hedge_stats is not None:
+        put_metrics(METRICS_NAMESPACE, {"Model": model},
+                    {"HedgedRequests": (int(hedge_stats["hedged"]), "Count"),
+                     "HedgeWins": (int(hedge_stats["hedge_won"]), "Count"),
+                     "HedgesSuppressed": (int(hedge_stats["hedge_suppressed"]), "Count")})
     
     message = {
         "prompt": truncated_prompt,
         "original_prompt": prompt,
         "was_truncated": prompt != truncated_prompt,
-        'generated_text': generated_text
+        'generated_text': generated_text,
+        "endpoint_name": endpoint_name,
+        "profile": profile_name,
+        "hedged": bool(hedge_stats and hedge_stats["hedged"])
     }
     
+    with trace.hop('json_encode'):
+        response_body = json.dumps(message)
+    
     return {
         "statusCode": 200,
-        "body": json.dumps(message),
+        "body": response_body,
         "headers": {
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            **trace.headers()
         }
     }
\ No newline at end of file
@@ -1,10 +1,27 @@
+import hashlib
+import json
+
 from aws_cdk import (
     aws_sagemaker as sagemaker,
-    CfnOutput
+    aws_lambda as _lambda,
+    aws_iam as iam,
+    aws_events as events,
+    aws_events_targets as targets,
+    aws_s3 as s3,
+    custom_resources as cr,
+    CfnOutput,
+    CustomResource,
+    Duration,
+    RemovalPolicy,
+    Stack,
 )
 from constructs import Construct
 
 
+def _properties_hash(*values) -> str:
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:8]
+
+
 class SageMakerEndpointConstruct(Construct):
 
     def __init__(self, scope: Construct, construct_id: str, 
@@ -19,9 +36,27 @@ class SageMakerEndpointConstruct(Construct):
         instance_count: int,
         instance_type: str,
         environment: dict,
-        deploy_enable: bool) -> None:
+        deploy_enable: bool,
+        warmup_requests: list = None,
+        keep_warm_request: dict = None,
+        keep_warm_interval: Duration = None,
+        stage_model_artifacts: bool = False,
+        container_startup_health_check_timeout: int = None,
+        model_data_download_timeout: int = None) -> None:
         super().__init__(scope, construct_id)
+
+        # The model and endpoint config are replaced when their properties change, so their names
+        # carry a hash of the properties. The endpoint itself is updated in place.
+        model_hash = _properties_hash(model_docker_image, model_bucket_name, model_bucket_key, environment,
+                                      stage_model_artifacts)
+        deployment_hash = _properties_hash(model_hash, variant_name, variant_weight, instance_count, instance_type,
+                                           container_startup_health_check_timeout, model_data_download_timeout)
         
+        if stage_model_artifacts:
+            # Reading the bucket name from the custom resource makes the model wait for the copy
+            staged_artifacts = self._stage_model_artifacts(model_name, model_bucket_name, model_bucket_key)
+            model_bucket_name = staged_artifacts.get_att_string("TargetBucket")
+
         model = sagemaker.CfnModel(self, f"{model_name}-Model",
                             execution_role_arn= role_arn,
                             containers=[
@@ -39,18 +74,20 @@ class SageMakerEndpointConstruct(Construct):
                                         ),
                                     )
                                 ],
-                            model_name= f"{project_prefix}-{model_name}-Model",
+                            model_name= f"{project_prefix}-{model_name}-Model-{model_hash}",
         )
         
         config = sagemaker.CfnEndpointConfig(self, f"{model_name}-Config",
-                            endpoint_config_name= f"{project_prefix}-{model_name}-Config",
+                            endpoint_config_name= f"{project_prefix}-{model_name}-Config-{deployment_hash}",
                             production_variants=[
                                 sagemaker.CfnEndpointConfig.ProductionVariantProperty(
                                     model_name= model.attr_model_name,
                                     variant_name= variant_name,
                                     initial_variant_weight= variant_weight,
                                     initial_instance_count= instance_count,
-                                    instance_type= instance_type
+                                    instance_type= instance_type,
+                                    container_startup_health_check_timeout_in_seconds= container_startup_health_check_timeout,
+                                    model_data_download_timeout_in_seconds= model_data_download_timeout
                                 )
                             ]
         )
@@ -63,8 +100,128 @@ class SageMakerEndpointConstruct(Construct):
             )
             
             CfnOutput(scope=self,id=f"{model_name}EndpointName", value=self.endpoint.endpoint_name)
+
+            if warmup_requests or keep_warm_request:
+                self._add_warmup(model_name, deployment_hash, warmup_requests, keep_warm_request, keep_warm_interval)
             
             
+    def _stage_model_artifacts(self, model_name: str, model_bucket_name: str, model_bucket_key: str) -> CustomResource:
+        """
+        Copies the model artifacts from the JumpStart bucket into a bucket owned by the project at deploy
+        time, so that instances started by a scale-out or a replacement download them from there.
+        """
+        bucket = s3.Bucket(self, f"{model_name}-Artifacts",
+                            encryption=s3.BucketEncryption.S3_MANAGED,
+                            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+                            enforce_ssl=True,
+                            removal_policy=RemovalPolicy.DESTROY,
+                            auto_delete_objects=True,
+        )
+
+        # on_event only acknowledges the request, is_complete copies the artifacts in batches and is
+        # polled until the copy is done, so large models are not limited by the Lambda timeout
+        on_event_function = _lambda.Function(self, f"{model_name}-StageArtifacts",
+                            runtime=_lambda.Runtime.PYTHON_3_9,
+                            code=_lambda.Code.from_asset("code/lambda_stage_model_artifacts"),
+                            handler="stage_artifacts.on_event",
+                            timeout=Duration.minutes(1),
+        )
+        is_complete_function = _lambda.Function(self, f"{model_name}-StageArtifactsIsComplete",
+                            runtime=_lambda.Runtime.PYTHON_3_9,
+                            code=_lambda.Code.from_asset("code/lambda_stage_model_artifacts"),
+                            handler="stage_artifacts.is_complete",
+                            timeout=Duration.minutes(15),
+                            memory_size=1024,
+        )
+        is_complete_function.add_to_role_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=["s3:ListBucket"],
+            resources=[f"arn:aws:s3:::{model_bucket_name}"],
+        ))
+        is_complete_function.add_to_role_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=["s3:GetObject"],
+            resources=[f"arn:aws:s3:::{model_bucket_name}/{model_bucket_key}*"],
+        ))
+        bucket.grant_read_write(is_complete_function)
+
+        provider = cr.Provider(self, f"{model_name}-StageArtifactsProvider",
+                            on_event_handler=on_event_function,
+                            is_complete_handler=is_complete_function,
+                            query_interval=Duration.seconds(30),
+                            total_timeout=Duration.hours(2),
+        )
+
+        # The key of the artifacts changes with the model version, which stages the new version
+        staged = CustomResource(self, f"{model_name}-StagedArtifacts",
+                            service_token=provider.service_token,
+                            properties={
+                                "SourceBucket": model_bucket_name,
+                                "SourcePrefix": model_bucket_key,
+                                "TargetBucket": bucket.bucket_name,
+                                "TargetPrefix": model_bucket_key,
+                            }
+        )
+        return staged
+
+    def _add_warmup(self, model_name: str, deployment_hash: str,
+        warmup_requests: list,
+        keep_warm_request: dict,
+        keep_warm_interval: Duration) -> None:
+        """
+        Sends representative requests once the endpoint is InService, so that the first user request
+        does not pay for model loading and container warm-up, and optionally keeps it warm on a schedule.
+        Each request is a dict of invoke_endpoint arguments (ContentType, Accept, Body).
+        """
+        endpoint_name = self.endpoint.attr_endpoint_name
+
+        warmup_function = _lambda.Function(self, f"{model_name}-Warmup",
+                            runtime=_lambda.Runtime.PYTHON_3_9,
+                            code=_lambda.Code.from_asset("code/lambda_endpoint_warmup"),
+                            handler="warmup.lambda_handler",
+                            timeout=Duration.minutes(15),
+        )
+        warmup_function.add_to_role_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=["sagemaker:InvokeEndpoint"],
+            resources=[Stack.of(self).format_arn(service="sagemaker", resource="endpoint",
+                                                 resource_name=self.endpoint.endpoint_name.lower())],
+        ))
+        warmup_function.add_to_role_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=["cloudwatch:PutMetricData"],
+            resources=["*"],
+        ))
+
+        if warmup_requests:
+            provider = cr.Provider(self, f"{model_name}-WarmupProvider", on_event_handler=warmup_function)
+
+            # CloudFormation only completes the endpoint once it is InService. The hash of the model
+            # and variant properties is passed so that the warm-up runs again whenever they change.
+            warmup = CustomResource(self, f"{model_name}-Warmup-Resource",
+                            service_token=provider.service_token,
+                            properties={
+                                "EndpointName": endpoint_name,
+                                "DeploymentHash": deployment_hash,
+                                "Requests": warmup_requests,
+                            }
+            )
+            warmup.node.add_dependency(self.endpoint)
+
+            CfnOutput(scope=self, id=f"{model_name}FirstInferenceMs", value=warmup.get_att_string("FirstInferenceMs"))
+            CfnOutput(scope=self, id=f"{model_name}SteadyStateMs", value=warmup.get_att_string("SteadyStateMs"))
+
+        if keep_warm_request and keep_warm_interval:
+            events.Rule(self, f"{model_name}-KeepWarm",
+                            schedule=events.Schedule.rate(keep_warm_interval),
+                            targets=[targets.LambdaFunction(warmup_function,
+                                event=events.RuleTargetInput.from_object({
+                                    "EndpointName": endpoint_name,
+                                    "Request": keep_warm_request,
+                                })
+                            )]
+            )
+
     @property
     def endpoint_name(self) -> str:
         return self.endpoint.attr_endpoint_name if self.deploy_enable else "not_yet_deployed"
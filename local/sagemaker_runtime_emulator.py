@@ -0,0 +1,108 @@
+"""
+Emulates the invoke_endpoint contract of the SageMaker runtime client for the two models of
+this project, so the Lambda handlers and the web application can run without GPU endpoints.
+
+- Stable Diffusion (txt2img): "application/x-text" prompts, or JSON with a "prompt" key.
+  Returns {"generated_image": <height x width x 3 list>, "prompt": ...} like the JumpStart model.
+- FLAN-T5 (txt2nlu): JSON with "inputs" and "parameters". Returns [{"generated_text": ...}].
+
+Responses are deterministic for a given request. Latency and the number of requests an
+endpoint serves concurrently are configurable; excess requests queue like on a model server.
+"""
+import functools
+import hashlib
+import io
+import json
+import threading
+import time
+
+WORDS = ("the", "customer", "battery", "phone", "agent", "charging", "settings", "apple", "store",
+         "repair", "warranty", "restart", "issue", "suggested", "service", "appointment", "days",
+         "positive", "negative", "neutral", "steps", "reset", "apps", "power", "help", "online")
+
+
+def _seed(value):
+    return int.from_bytes(hashlib.sha256(value.encode("utf-8")).digest()[:8], "big")
+
+
+@functools.lru_cache(maxsize=8)
+def generate_image(prompt, size):
+    """
+    Returns a JSON encoded size x size RGB image derived from the prompt.
+    """
+    seed = _seed(prompt)
+    r, g, b = seed % 7 + 1, seed // 7 % 7 + 1, seed // 49 % 7 + 1
+    offset = seed % 256
+    image = [[[(x * r + offset) % 256, (y * g + offset) % 256, (x + y) * b % 256] for x in range(size)]
+             for y in range(size)]
+    return json.dumps({"generated_image": image, "prompt": prompt}).encode("utf-8")
+
+
+def generate_text(prompt, max_tokens):
+    """
+    Returns between 8 and 120 words derived from the prompt, capped at max_tokens.
+    """
+    seed = _seed(prompt)
+    length = min(8 + seed % 113, max_tokens)
+    words = [WORDS[((seed >> (i % 56)) + i) % len(WORDS)] for i in range(length)]
+    return " ".join(words)
+
+
+class EmulatorError(Exception):
+    pass
+
+
+class SageMakerRuntimeEmulator:
+
+    def __init__(self,
+        text_latency: float = 0.3,
+        text_latency_per_token: float = 0.02,
+        image_latency: float = 4.0,
+        max_concurrency: int = 1,
+        image_size: int = 512) -> None:
+        self.text_latency = text_latency
+        self.text_latency_per_token = text_latency_per_token
+        self.image_latency = image_latency
+        self.max_concurrency = max_concurrency
+        self.image_size = image_size
+
+        self._lock = threading.Lock()
+        self._slots = {}
+
+    def _slot(self, endpoint_name):
+        with self._lock:
+            return self._slots.setdefault(endpoint_name, threading.BoundedSemaphore(self.max_concurrency))
+
+    def invoke_endpoint(self, EndpointName, Body, ContentType="application/json", Accept=None,
+                        CustomAttributes=None, TargetVariant=None, **kwargs):
+        body = Body.decode("utf-8") if isinstance(Body, bytes) else Body
+
+        if ContentType == "application/x-text":
+            request = {"prompt": body}
+        elif ContentType == "application/json":
+            request = json.loads(body)
+        else:
+            raise EmulatorError(f"Unsupported ContentType {ContentType}")
+
+        with self._slot(EndpointName):
+            if "prompt" in request:
+                start = time.time()
+                response_body = generate_image(request["prompt"], self.image_size)
+                time.sleep(max(self.image_latency - (time.time() - start), 0.0))
+            elif "inputs" in request:
+                parameters = request.get("parameters", {})
+                max_tokens = parameters.get("max_new_tokens", parameters.get("max_length", 50))
+                generated_text = generate_text(request["inputs"], max_tokens)
+                time.sleep(self.text_latency + self.text_latency_per_token * len(generated_text.split()))
+                response_body = json.dumps([{"generated_text": generated_text}]).encode("utf-8")
+            else:
+                raise EmulatorError("Request has neither a 'prompt' nor an 'inputs' key")
+
+        response = {
+            "Body": io.BytesIO(response_body),
+            "ContentType": "application/json",
+            "InvokedProductionVariant": TargetVariant or "AllTraffic",
+        }
+        if CustomAttributes:
+            response["CustomAttributes"] = CustomAttributes
+        return response
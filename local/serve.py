@@ -0,0 +1,112 @@
+"""
+Serves the inference Lambda handlers behind a local HTTP shim that mimics the API Gateway proxy
+integration, with SageMaker replaced by the runtime emulator. Point the web application at it
+with the printed environment variables, which override the SSM parameters of the same name:
+
+    python local/serve.py --port 8080
+    cd web-app && TXT2IMG_API_ENDPOINT=http://localhost:8080/txt2img/ ... streamlit run Home.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "code", "lambda_layer_common", "python"),
+                os.path.join(ROOT, "code", "lambda_txt2img"),
+                os.path.join(ROOT, "code", "lambda_txt2nlu")]
+
+from sagemaker_runtime_emulator import SageMakerRuntimeEmulator
+
+
+def build_routes(emulator):
+    # The handlers create their boto3 clients at import time, which only needs a region
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    import txt2img
+    import txt2nlu
+
+    routes = {}
+    for name, module in (("txt2img", txt2img), ("txt2nlu", txt2nlu)):
+        module.runtime = emulator
+        routes[f"/{name}"] = module.lambda_handler
+    return routes
+
+
+def make_handler(routes):
+
+    class LambdaProxyHandler(BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            handler = routes.get(self.path.rstrip("/"))
+            if handler is None:
+                return self._respond(404, {"Content-Type": "application/json"}, json.dumps({"message": "Not Found"}))
+
+            length = int(self.headers.get("Content-Length", 0))
+            event = {
+                "body": self.rfile.read(length).decode("utf-8"),
+                "headers": dict(self.headers),
+                "requestContext": {"requestTimeEpoch": int(time.time() * 1000)},
+            }
+
+            try:
+                result = handler(event, None)
+            except Exception:
+                traceback.print_exc()
+                return self._respond(502, {"Content-Type": "application/json"},
+                                     json.dumps({"message": "Internal server error"}))
+
+            self._respond(result["statusCode"], result.get("headers", {}), result["body"])
+
+        def _respond(self, status, headers, body):
+            body = body.encode("utf-8")
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return LambdaProxyHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool-size", type=int, default=2, help="emulated endpoints per model")
+    parser.add_argument("--text-latency", type=float, default=0.3, help="seconds per text request")
+    parser.add_argument("--text-latency-per-token", type=float, default=0.02, help="seconds per generated word")
+    parser.add_argument("--image-latency", type=float, default=4.0, help="seconds per image")
+    parser.add_argument("--max-concurrency", type=int, default=1, help="concurrent requests per endpoint")
+    parser.add_argument("--image-size", type=int, default=512)
+    args = parser.parse_args()
+
+    base_url = f"http://localhost:{args.port}"
+    parameters = {}
+    for model in ("txt2img", "txt2nlu"):
+        pool = [f"local-{model}-{i}" for i in range(1, args.pool_size + 1)]
+        parameters[f"{model.upper()}_API_ENDPOINT"] = f"{base_url}/{model}/"
+        parameters[f"{model.upper()}_SM_ENDPOINT"] = pool[0]
+        parameters[f"{model.upper()}_SM_ENDPOINT_POOL"] = ",".join(pool)
+    for name, value in parameters.items():
+        os.environ.setdefault(name, value)
+
+    emulator = SageMakerRuntimeEmulator(text_latency=args.text_latency,
+                                        text_latency_per_token=args.text_latency_per_token,
+                                        image_latency=args.image_latency,
+                                        max_concurrency=args.max_concurrency,
+                                        image_size=args.image_size)
+    server = ThreadingHTTPServer(("", args.port), make_handler(build_routes(emulator)))
+
+    print("Configure the web application with:")
+    for name, value in parameters.items():
+        print(f"  export {name}={os.environ[name]}")
+    print(f"Serving the inference Lambdas on {base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Reports how long SageMaker endpoints take to become InService, to compare deployments with and
+without staged model artifacts.
+
+By default the script waits for each endpoint to be created or updated, for example by a
+`cdk deploy` running next to it, and measures from the start of the create or update to
+InService. An endpoint that is already InService is ignored until its next update.
+
+With --scale-out, the script adds one instance to the first production variant of each InService
+endpoint, measures how long the new instance takes to serve, and then restores the instance count.
+This is the startup that staging the artifacts shortens. Run it once with each setting of
+STAGE_MODEL_ARTIFACTS. Note that the extra instance is billed while it runs.
+
+Example:
+    python script/endpoint_startup_time.py GenerativeAiDemo-HuggingfaceText2TextFlan-Endpoint
+    python script/endpoint_startup_time.py --scale-out GenerativeAiDemo-HuggingfaceText2TextFlan-Endpoint
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+IN_PROGRESS = ("Creating", "Updating", "SystemUpdating")
+
+
+def describe(sagemaker_client, endpoint_name):
+    try:
+        return sagemaker_client.describe_endpoint(EndpointName=endpoint_name)
+    except sagemaker_client.exceptions.ClientError as e:
+        # The endpoint does not exist until CloudFormation creates it
+        if "Could not find endpoint" in str(e):
+            return None
+        raise
+
+
+def wait_for_start(sagemaker_client, endpoint_name, poll_interval, timeout):
+    """
+    Waits until the endpoint is being created or updated and returns when that started.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        description = describe(sagemaker_client, endpoint_name)
+        if description and description["EndpointStatus"] in IN_PROGRESS:
+            # Set when the create or update started, also if the script started later
+            return description["LastModifiedTime"]
+        time.sleep(poll_interval)
+    raise TimeoutError(f"{endpoint_name} was not created or updated within {timeout} s")
+
+
+def wait_in_service(sagemaker_client, endpoint_name, poll_interval):
+    while True:
+        description = sagemaker_client.describe_endpoint(EndpointName=endpoint_name)
+        if description["EndpointStatus"] not in IN_PROGRESS:
+            return description
+        time.sleep(poll_interval)
+
+
+def report(sagemaker_client, endpoint_name, started, poll_interval, label):
+    description = wait_in_service(sagemaker_client, endpoint_name, poll_interval)
+    status = description["EndpointStatus"]
+    if status != "InService":
+        print(f"{endpoint_name}: {status} {description.get('FailureReason', '')}")
+        return
+
+    # Once the endpoint is InService, LastModifiedTime is when it got there
+    in_service = description["LastModifiedTime"]
+    print(f"{endpoint_name}: {label} InService after {(in_service - started).total_seconds():.0f} s "
+          f"(started {started:%Y-%m-%d %H:%M:%S}, InService {in_service:%Y-%m-%d %H:%M:%S})")
+
+
+def scale_out(sagemaker_client, endpoint_name, poll_interval, timeout):
+    variant = sagemaker_client.describe_endpoint(EndpointName=endpoint_name)["ProductionVariants"][0]
+    instance_count = variant["CurrentInstanceCount"]
+
+    def set_instance_count(count):
+        sagemaker_client.update_endpoint_weights_and_capacities(
+            EndpointName=endpoint_name,
+            DesiredWeightsAndCapacities=[{"VariantName": variant["VariantName"], "DesiredInstanceCount": count}])
+
+    set_instance_count(instance_count + 1)
+    try:
+        started = wait_for_start(sagemaker_client, endpoint_name, poll_interval, timeout)
+        report(sagemaker_client, endpoint_name, started, poll_interval,
+               f"instance {instance_count + 1} of {variant['VariantName']}")
+    finally:
+        wait_in_service(sagemaker_client, endpoint_name, poll_interval)
+        set_instance_count(instance_count)
+        print(f"{endpoint_name}: scaling {variant['VariantName']} back to {instance_count} instance(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("endpoint_names", nargs="+")
+    parser.add_argument("--scale-out", action="store_true", help="add an instance and measure its startup")
+    parser.add_argument("--poll-interval", type=int, default=15, help="seconds between status checks")
+    parser.add_argument("--timeout", type=int, default=3600, help="seconds to wait for a create or update to start")
+    args = parser.parse_args()
+
+    sagemaker_client = boto3.client("sagemaker")
+    if args.scale_out:
+        for endpoint_name in args.endpoint_names:
+            scale_out(sagemaker_client, endpoint_name, args.poll_interval, args.timeout)
+        return
+
+    def measure(endpoint_name):
+        started = wait_for_start(sagemaker_client, endpoint_name, args.poll_interval, args.timeout)
+        report(sagemaker_client, endpoint_name, started, args.poll_interval, "create or update")
+
+    # The endpoints of a deployment are created or updated at the same time
+    with ThreadPoolExecutor(max_workers=len(args.endpoint_names)) as executor:
+        list(executor.map(measure, args.endpoint_names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Steps up the number of concurrent users of the web application and reports, for every step, the
+latency percentiles next to the number of tasks of the web application's ECS service. This shows
+whether the service scales out before latency degrades.
+
+Every user is a headless browser session on the Text Generation page that clicks
+"Generate Response" and waits for the answer, so the load goes through Streamlit's websocket
+sessions, the session and in-flight request metrics and the ALB like real traffic does.
+Requires Playwright:
+
+    pip install -r requirements-dev.txt && playwright install chromium
+
+Example:
+    python script/load_test.py --url <web application url> \
+        --steps 2,4,8,16 --step-duration 300 --cluster <cluster name> --service <service name>
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import boto3
+
+try:
+    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+except ImportError:
+    async_playwright = None
+
+PAGE_PATH = "/Text_Generation"
+BUTTON_NAME = "Generate Response"
+SPINNER_TEXT = "Wait for it..."
+ERROR_SELECTOR = '[data-testid="stException"], [data-testid="stAlertContentError"]'
+SPINNER_TIMEOUT = 10  # seconds for the spinner to show up after a click
+
+
+async def run_session(browser, url, deadline, timeout, think_time, latencies, errors):
+    context = await browser.new_context()
+    try:
+        page = await context.new_page()
+        await page.goto(url + PAGE_PATH, timeout=timeout * 1000)
+        button = page.get_by_role("button", name=BUTTON_NAME).first
+        spinner = page.get_by_text(SPINNER_TEXT)
+        await button.wait_for(timeout=timeout * 1000)
+
+        while time.time() < deadline:
+            start = time.time()
+            try:
+                await button.click()
+                await spinner.wait_for(state="visible", timeout=SPINNER_TIMEOUT * 1000)
+                await spinner.wait_for(state="hidden", timeout=timeout * 1000)
+                if await page.locator(ERROR_SELECTOR).count():
+                    raise RuntimeError("the page shows an error")
+                latencies.append(time.time() - start)
+            except (PlaywrightTimeoutError, RuntimeError):
+                errors.append(time.time() - start)
+            await asyncio.sleep(think_time)
+    finally:
+        await context.close()
+
+
+async def run_step(url, sessions, duration, timeout, think_time):
+    latencies = []
+    errors = []
+    deadline = time.time() + duration
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch()
+        try:
+            await asyncio.gather(*[run_session(browser, url, deadline, timeout, think_time, latencies, errors)
+                                   for _ in range(sessions)])
+        finally:
+            await browser.close()
+
+    return latencies, len(errors)
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100)[p - 1]
+
+
+def get_task_counts(ecs, cluster, service):
+    if ecs is None:
+        return "-", "-"
+    description = ecs.describe_services(cluster=cluster, services=[service])["services"][0]
+    return description["desiredCount"], description["runningCount"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="URL of the web application's load balancer")
+    parser.add_argument("--steps", default="1,2,4,8,16", help="comma separated numbers of concurrent sessions")
+    parser.add_argument("--step-duration", type=int, default=300, help="seconds per step")
+    parser.add_argument("--think-time", type=float, default=5, help="seconds a user waits between requests")
+    parser.add_argument("--timeout", type=int, default=180)
+    parser.add_argument("--cluster", help="ECS cluster of the web application")
+    parser.add_argument("--service", help="ECS service of the web application")
+    args = parser.parse_args()
+
+    if async_playwright is None:
+        parser.error("Playwright is not installed, run: pip install -r requirements-dev.txt && playwright install chromium")
+
+    url = args.url.rstrip("/")
+    ecs = boto3.client("ecs") if args.cluster and args.service else None
+
+    print(f"{'sessions':>8} {'requests':>8} {'errors':>6} {'p50 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8} {'desired':>7} {'running':>7}")
+    for sessions in [int(step) for step in args.steps.split(",")]:
+        latencies, errors = asyncio.run(run_step(url, sessions, args.step_duration, args.timeout, args.think_time))
+        desired, running = get_task_counts(ecs, args.cluster, args.service)
+        print(f"{sessions:>8} {len(latencies):>8} {errors:>6} "
+              f"{percentile(latencies, 50):>8.2f} {percentile(latencies, 95):>8.2f} {percentile(latencies, 99):>8.2f} "
+              f"{desired:>7} {running:>7}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
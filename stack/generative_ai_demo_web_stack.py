@@ -9,12 +9,18 @@ from aws_cdk import (
     aws_ecs as ecs,
     aws_ecs_patterns as ecs_patterns,
     aws_autoscaling as autoscaling,
+    aws_cloudwatch as cloudwatch,
 )
 from constructs import Construct
 
 class GenerativeAiDemoWebStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, vpc: ec2.IVpc, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, vpc: ec2.IVpc,
+        max_task_count: int = 10,
+        sessions_per_task: int = 20,
+        in_flight_requests_per_task: int = 8,
+        requests_per_target: int = 200,
+        **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         # Defines role for the AWS Lambda functions
@@ -28,6 +34,20 @@ class GenerativeAiDemoWebStack(Stack):
                 resources=["*"]
             )]
         ))
+        role.attach_inline_policy(iam.Policy(self, "ssm-endpoint-pool-policy",
+            statements=[iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=["ssm:GetParameter"],
+                resources=[f"arn:aws:ssm:{self.region}:{self.account}:parameter/*_sm_endpoint*"]
+            )]
+        ))
+        
+        # Defines a Lambda layer with the code shared by the inference Lambda functions
+        common_layer = _lambda.LayerVersion(
+            self, "lambda_layer_common",
+            code=_lambda.Code.from_asset("code/lambda_layer_common"),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_9],
+        )
         
         # Defines an AWS Lambda function for Image Generation service
         lambda_txt2img = _lambda.Function(
@@ -36,6 +56,8 @@ class GenerativeAiDemoWebStack(Stack):
             code=_lambda.Code.from_asset("code/lambda_txt2img"),
             handler="txt2img.lambda_handler",
             role=role,
+            layers=[common_layer],
+            environment={"DEFAULT_MODEL": "txt2img"},
             timeout=Duration.seconds(180),
             memory_size=512,
             vpc_subnets=ec2.SubnetSelection(
@@ -57,6 +79,14 @@ class GenerativeAiDemoWebStack(Stack):
             code=_lambda.Code.from_asset("code/lambda_txt2nlu"),
             handler="txt2nlu.lambda_handler",
             role=role,
+            layers=[common_layer],
+            environment={
+                "DEFAULT_MODEL": "txt2nlu",
+                # Hedging is opt-in, per request with "hedge": true or for all requests here
+                "HEDGE_ENABLED": "false",
+                "HEDGE_PERCENTILE": "95",
+                "HEDGE_MAX_RATE": "0.1",
+            },
             timeout=Duration.seconds(180),
             memory_size=512,
             vpc_subnets=ec2.SubnetSelection(
@@ -136,6 +166,10 @@ class GenerativeAiDemoWebStack(Stack):
         # Build Dockerfile from local folder and push to ECR
         image = ecs.ContainerImage.from_asset("web-app")
 
+        # Concurrency metrics published by the web application (see web-app/session_metrics.py)
+        web_metrics_namespace = "GenerativeAiDemo/WebApp"
+        web_metrics_service = "WebApplication"
+
         # Create Fargate service
         fargate_service = ecs_patterns.ApplicationLoadBalancedFargateService(
             self, "WebApplication",
@@ -145,6 +179,10 @@ class GenerativeAiDemoWebStack(Stack):
             task_image_options=ecs_patterns.ApplicationLoadBalancedTaskImageOptions(
                 image=image, 
                 container_port=8501,
+                environment={
+                    "METRICS_NAMESPACE": web_metrics_namespace,
+                    "METRICS_SERVICE": web_metrics_service,
+                },
                 ),
             #load_balancer_name="gen-ai-demo",
             memory_limit_mib=4096,      # Default is 512
@@ -165,10 +203,18 @@ class GenerativeAiDemoWebStack(Stack):
             )
         )          
 
+        fargate_service.task_definition.add_to_task_role_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions = ["cloudwatch:PutMetricData"],
+            resources = ["*"],
+            conditions = {"StringEquals": {"cloudwatch:namespace": web_metrics_namespace}},
+            )
+        )
+
 
         # Setup task auto-scaling
         scaling = fargate_service.service.auto_scale_task_count(
-            max_capacity=10
+            max_capacity=max_task_count
         )
         scaling.scale_on_cpu_utilization(
             "CpuScaling",
@@ -177,5 +223,32 @@ class GenerativeAiDemoWebStack(Stack):
             scale_out_cooldown=Duration.seconds(60),
         )
 
+        # Sessions spend most of their time waiting on inference, so CPU stays low while a task
+        # runs out of sessions and threads. Scale on concurrency as well, whichever policy asks
+        # for the most tasks wins.
+        for metric_name, target_value in (("ActiveSessions", sessions_per_task),
+                                          ("InFlightRequests", in_flight_requests_per_task)):
+            scaling.scale_to_track_custom_metric(
+                f"{metric_name}Scaling",
+                metric=cloudwatch.Metric(
+                    namespace=web_metrics_namespace,
+                    metric_name=metric_name,
+                    dimensions_map={"Service": web_metrics_service},
+                    statistic="Average",    # each task publishes its own value, so this is the per-task average
+                    period=Duration.minutes(1),
+                ),
+                target_value=target_value,
+                scale_in_cooldown=Duration.seconds(300),
+                scale_out_cooldown=Duration.seconds(60),
+            )
+
+        scaling.scale_on_request_count(
+            "RequestCountScaling",
+            requests_per_target=requests_per_target,
+            target_group=fargate_service.target_group,
+            scale_in_cooldown=Duration.seconds(300),
+            scale_out_cooldown=Duration.seconds(60),
+        )
+
         ssm.StringParameter(self, "txt2img_api_endpoint", parameter_name="txt2img_api_endpoint", string_value=txt2img_apigw_endpoint.url)
         ssm.StringParameter(self, "txt2nlu_api_endpoint", parameter_name="txt2nlu_api_endpoint", string_value=txt2nlu_apigw_endpoint.url)
\ No newline at end of file
@@ -1,4 +1,7 @@
+import json
+
 from aws_cdk import (
+    Duration,
     Stack,
     aws_iam as iam,
     aws_ssm as ssm,
@@ -10,7 +13,7 @@ from construct.sagemaker_endpoint_construct import SageMakerEndpointConstruct
 
 class GenerativeAiTxt2imgSagemakerStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, model_info, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, model_info, stage_model_artifacts: bool = False, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         
         role = iam.Role(self, "Gen-AI-SageMaker-Policy", assumed_by=iam.ServicePrincipal("sagemaker.amazonaws.com"))
@@ -78,7 +81,23 @@ class GenerativeAiTxt2imgSagemakerStack(Stack):
                                         "SAGEMAKER_SUBMIT_DIRECTORY": "/opt/ml/model/code",
                                     },
 
-                                    deploy_enable = True
+                                    deploy_enable = True,
+
+                                    warmup_requests = [
+                                        {"ContentType": "application/x-text", "Body": prompt} for prompt in (
+                                            "Dog in superhero outfit",
+                                            "A photo of an astronaut riding a horse on mars",
+                                            "A watercolor painting of a lighthouse at sunset",
+                                        )
+                                    ],
+                                    keep_warm_request = {
+                                        "ContentType": "application/json",
+                                        "Accept": "application/json",
+                                        "Body": json.dumps({"prompt": "keep warm", "num_inference_steps": 1}),
+                                    },
+                                    keep_warm_interval = Duration.minutes(5),
+
+                                    stage_model_artifacts = stage_model_artifacts
         )
         
         endpoint.node.add_dependency(sts_policy)
@@ -86,3 +105,7 @@ class GenerativeAiTxt2imgSagemakerStack(Stack):
         endpoint.node.add_dependency(ecr_policy)
         
         ssm.StringParameter(self, "txt2img_sm_endpoint", parameter_name="txt2img_sm_endpoint", string_value=endpoint.endpoint_name)
+        
+        # Endpoint pool the inference Lambda routes the "txt2img" model to. Append the names of
+        # additional endpoints (e.g. other instance types) to spread load across them.
+        ssm.StringListParameter(self, "txt2img_sm_endpoint_pool", parameter_name="txt2img_sm_endpoint_pool", string_list_value=[endpoint.endpoint_name])
@@ -1,4 +1,7 @@
+import json
+
 from aws_cdk import (
+    Duration,
     Stack,
     aws_iam as iam,
     aws_ssm as ssm,
@@ -9,7 +12,7 @@ from construct.sagemaker_endpoint_construct import SageMakerEndpointConstruct
 
 class GenerativeAiTxt2nluSagemakerStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, model_info, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, model_info, stage_model_artifacts: bool = False, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         
         role = iam.Role(self, "Gen-AI-SageMaker-Policy", assumed_by=iam.ServicePrincipal("sagemaker.amazonaws.com"))
@@ -80,7 +83,22 @@ class GenerativeAiTxt2nluSagemakerStack(Stack):
                                         "TS_DEFAULT_WORKERS_PER_MODEL": "1"
                                     },
 
-                                    deploy_enable = True
+                                    deploy_enable = True,
+
+                                    warmup_requests = [
+                                        {"ContentType": "application/json", "Body": json.dumps({"inputs": prompt, "parameters": {"max_length": 128}})} for prompt in (
+                                            "Customer: My phone battery drains fast.\nAgent: Check Settings > Battery.\nwrite a summary",
+                                            "Customer: My phone battery drains fast.\nAgent: Check Settings > Battery.\nWhat is the overall sentiment of the conversation?",
+                                            "What steps should a customer take when their phone is not charging?",
+                                        )
+                                    ],
+                                    keep_warm_request = {
+                                        "ContentType": "application/json",
+                                        "Body": json.dumps({"inputs": "Hello", "parameters": {"max_length": 8}}),
+                                    },
+                                    keep_warm_interval = Duration.minutes(5),
+
+                                    stage_model_artifacts = stage_model_artifacts
         )
         
         endpoint.node.add_dependency(sts_policy)
@@ -88,3 +106,7 @@ class GenerativeAiTxt2nluSagemakerStack(Stack):
         endpoint.node.add_dependency(ecr_policy)
         
         ssm.StringParameter(self, "txt2nlu_sm_endpoint", parameter_name="txt2nlu_sm_endpoint", string_value=endpoint.endpoint_name)
+        
+        # Endpoint pool the inference Lambda routes the "txt2nlu" model to. Append the names of
+        # additional endpoints (e.g. other instance types) to spread load across them.
+        ssm.StringListParameter(self, "txt2nlu_sm_endpoint_pool", parameter_name="txt2nlu_sm_endpoint_pool", string_list_value=[endpoint.endpoint_name])
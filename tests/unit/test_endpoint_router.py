@@ -0,0 +1,148 @@
+import os
+import random
+import sys
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "code", "lambda_layer_common", "python"))
+
+import endpoint_router
+from endpoint_router import EndpointRouter, UnknownModelError
+
+POOL = ["endpoint-a", "endpoint-b"]
+
+
+def client_error(code, status_code, original_status_code=None):
+    response = {"Error": {"Code": code, "Message": code}, "ResponseMetadata": {"HTTPStatusCode": status_code}}
+    if original_status_code is not None:
+        response["OriginalStatusCode"] = original_status_code
+    return ClientError(response, "InvokeEndpoint")
+
+
+@pytest.fixture
+def ssm_client():
+    client = boto3.client("ssm", region_name="us-east-1")
+    with Stubber(client) as stubber:
+        yield client, stubber
+
+
+@pytest.fixture
+def router(ssm_client, monkeypatch):
+    monkeypatch.setenv("TXT2NLU_SM_ENDPOINT_POOL", ",".join(POOL))
+    return EndpointRouter(["txt2nlu"], ssm_client=ssm_client[0], rng=random.Random(0))
+
+
+def call_many(router, latencies, count=1000):
+    chosen = {name: 0 for name in POOL}
+    for _ in range(count):
+        endpoint_name = router.choose("txt2nlu")
+        chosen[endpoint_name] += 1
+        router.release(endpoint_name, latencies[endpoint_name])
+    return chosen
+
+
+def test_selection_spreads_by_latency(router):
+    chosen = call_many(router, {"endpoint-a": 1.0, "endpoint-b": 0.25})
+
+    # The slower endpoint keeps getting a share of the traffic in proportion to its speed
+    assert 100 < chosen["endpoint-a"] < 350
+    assert chosen["endpoint-b"] > chosen["endpoint-a"]
+
+
+def test_selection_prefers_endpoints_with_fewer_requests_in_flight(router):
+    for _ in range(20):
+        router.choose("txt2nlu", exclude=("endpoint-b",))
+
+    chosen = [router.choose("txt2nlu") for _ in range(10)]
+    assert chosen.count("endpoint-b") > chosen.count("endpoint-a")
+
+
+def test_stale_latency_is_probed_again(router, monkeypatch):
+    call_many(router, {"endpoint-a": 5.0, "endpoint-b": 0.1}, count=50)
+
+    now = endpoint_router.time.time() + endpoint_router.LATENCY_STALE_SECONDS + 1
+    monkeypatch.setattr(endpoint_router.time, "time", lambda: now)
+    router._stats["endpoint-b"].latency_updated = now
+
+    # endpoint-a's old latency is forgotten, it is weighted like the pool average
+    chosen = [router.choose("txt2nlu") for _ in range(200)]
+    assert chosen.count("endpoint-a") > 50
+
+
+def test_endpoint_failures_eject_and_recover(router, monkeypatch):
+    for _ in range(endpoint_router.EJECT_AFTER_ERRORS):
+        router.choose("txt2nlu", exclude=("endpoint-b",))
+        router.release("endpoint-a", 0.1, client_error("ServiceUnavailable", 503))
+
+    assert all(router.choose("txt2nlu") == "endpoint-b" for _ in range(20))
+
+    now = endpoint_router.time.time() + endpoint_router.EJECT_SECONDS + 1
+    monkeypatch.setattr(endpoint_router.time, "time", lambda: now)
+    assert "endpoint-a" in {router.choose("txt2nlu") for _ in range(50)}
+
+
+def test_all_ejected_fails_open_on_first_to_recover(router):
+    for name in POOL:
+        for _ in range(endpoint_router.EJECT_AFTER_ERRORS):
+            router.release(name, 0.1, client_error("ThrottlingException", 400))
+    router._stats["endpoint-b"].ejected_until -= 10
+
+    assert router.choose("txt2nlu") == "endpoint-b"
+
+
+def test_request_errors_do_not_eject(router):
+    for _ in range(endpoint_router.EJECT_AFTER_ERRORS * 2):
+        router.release("endpoint-a", 0.1, client_error("ValidationError", 400))
+        router.release("endpoint-a", 0.1, client_error("ModelError", 424, original_status_code=400))
+
+    assert not router._stats["endpoint-a"].is_ejected(endpoint_router.time.time())
+
+
+def test_is_endpoint_failure():
+    assert endpoint_router.is_endpoint_failure(client_error("ThrottlingException", 400))
+    assert endpoint_router.is_endpoint_failure(client_error("InternalFailure", 500))
+    assert endpoint_router.is_endpoint_failure(client_error("ModelError", 424, original_status_code=503))
+    assert not endpoint_router.is_endpoint_failure(client_error("ModelError", 424, original_status_code=400))
+    assert not endpoint_router.is_endpoint_failure(client_error("ValidationError", 400))
+    assert not endpoint_router.is_endpoint_failure(KeyError("Body"))
+
+
+def test_invoke_releases_on_error(router):
+    def fail(endpoint_name):
+        raise client_error("ServiceUnavailable", 503)
+
+    with pytest.raises(ClientError):
+        router.invoke("txt2nlu", fail)
+
+    assert sum(stats.in_flight for stats in router._stats.values()) == 0
+    assert sum(stats.consecutive_errors for stats in router._stats.values()) == 1
+
+
+def test_unknown_model(router):
+    with pytest.raises(UnknownModelError):
+        router.choose("txt2video")
+
+
+def test_pool_falls_back_to_single_endpoint(ssm_client):
+    client, stubber = ssm_client
+    stubber.add_client_error("get_parameter", "ParameterNotFound", expected_params={"Name": "txt2img_sm_endpoint_pool"})
+    stubber.add_response("get_parameter", {"Parameter": {"Value": "endpoint-c"}},
+                         expected_params={"Name": "txt2img_sm_endpoint"})
+    router = EndpointRouter(["txt2img"], ssm_client=client)
+
+    assert router.get_pool("txt2img") == ["endpoint-c"]
+    # The pool is cached, the stubber would fail on another call
+    assert router.get_pool("txt2img") == ["endpoint-c"]
+
+
+def test_model_without_parameters_is_unknown(ssm_client):
+    client, stubber = ssm_client
+    stubber.add_client_error("get_parameter", "ParameterNotFound")
+    stubber.add_client_error("get_parameter", "ParameterNotFound")
+    router = EndpointRouter(["txt2img"], ssm_client=client)
+
+    with pytest.raises(UnknownModelError):
+        router.get_pool("txt2img")
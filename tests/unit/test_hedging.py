@@ -0,0 +1,185 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "code", "lambda_layer_common", "python"))
+
+import hedging
+from endpoint_router import EndpointRouter
+from hedging import HedgedInvoker
+
+SLOW = 0.5
+DELAY = 0.05
+
+
+class FakeSSMClient:
+    pass
+
+
+def make_invoker(monkeypatch, pool, target_variants=(), max_rate=1.0, window=hedging.HEDGE_WINDOW):
+    monkeypatch.setenv("TXT2NLU_SM_ENDPOINT_POOL", ",".join(pool))
+    monkeypatch.setattr(hedging, "HEDGE_DEFAULT_DELAY", DELAY)
+    monkeypatch.setattr(hedging, "HEDGE_MAX_RATE", max_rate)
+    monkeypatch.setattr(hedging, "HEDGE_WINDOW", window)
+    router = EndpointRouter(["txt2nlu"], ssm_client=FakeSSMClient())
+    return router, HedgedInvoker(router, target_variants=target_variants)
+
+
+def first_call_slow(error=None, slow_delay=SLOW):
+    calls = []
+    lock = threading.Lock()
+
+    def call(endpoint_name, target_variant):
+        with lock:
+            calls.append((endpoint_name, target_variant))
+            first = len(calls) == 1
+        if first:
+            time.sleep(slow_delay)
+            if error is not None:
+                raise error
+            return "primary"
+        time.sleep(DELAY * 4)
+        return "hedge"
+
+    return call, calls
+
+
+def endpoint_error():
+    return ClientError({"Error": {"Code": "ServiceUnavailable"}, "ResponseMetadata": {"HTTPStatusCode": 503}},
+                       "InvokeEndpoint")
+
+
+def in_flight(router):
+    return sum(stats.in_flight for stats in router._stats.values())
+
+
+def test_hedge_wins(monkeypatch):
+    router, invoker = make_invoker(monkeypatch, ["endpoint-a", "endpoint-b"])
+    call, calls = first_call_slow()
+
+    endpoint_name, result, stats = invoker.invoke("txt2nlu", call)
+
+    assert result == "hedge"
+    assert endpoint_name == calls[1][0] != calls[0][0]
+    assert stats["hedged"] and stats["hedge_won"]
+    assert stats["hedge_delay"] >= DELAY
+    assert stats["latency"] < SLOW
+
+    time.sleep(SLOW)
+    assert in_flight(router) == 0
+
+
+def test_abandoned_call_is_not_recorded(monkeypatch):
+    router, invoker = make_invoker(monkeypatch, ["endpoint-a", "endpoint-b"])
+    monkeypatch.setattr(hedging, "HEDGE_MIN_SAMPLES", 1)
+    call, calls = first_call_slow()
+
+    invoker.invoke("txt2nlu", call)
+    time.sleep(SLOW)
+
+    # Only the winning call's latency is used for the hedge delay and the endpoint weights
+    assert invoker.hedge_delay("txt2nlu") < SLOW
+    assert router._stats[calls[0][0]].latency_ewma is None
+    assert in_flight(router) == 0
+
+
+def test_abandoned_call_error_does_not_count(monkeypatch):
+    router, invoker = make_invoker(monkeypatch, ["endpoint-a", "endpoint-b"])
+    call, calls = first_call_slow(endpoint_error())
+
+    endpoint_name, result, stats = invoker.invoke("txt2nlu", call)
+    time.sleep(SLOW)
+
+    assert result == "hedge"
+    assert router._stats[calls[0][0]].consecutive_errors == 0
+    assert in_flight(router) == 0
+
+
+def test_hedge_wins_when_primary_fails(monkeypatch):
+    router, invoker = make_invoker(monkeypatch, ["endpoint-a", "endpoint-b"])
+    # The primary fails while the hedge is still running
+    call, calls = first_call_slow(endpoint_error(), slow_delay=DELAY * 2)
+
+    endpoint_name, result, stats = invoker.invoke("txt2nlu", call)
+
+    assert result == "hedge" and stats["hedge_won"]
+    assert router._stats[calls[0][0]].consecutive_errors == 1
+    assert in_flight(router) == 0
+
+
+def test_fast_primary_is_not_hedged(monkeypatch):
+    router, invoker = make_invoker(monkeypatch, ["endpoint-a", "endpoint-b"])
+
+    endpoint_name, result, stats = invoker.invoke("txt2nlu", lambda endpoint_name, target_variant: "primary")
+
+    assert result == "primary"
+    assert not stats["hedged"] and not stats["hedge_won"]
+    assert stats["hedge_delay"] == 0.0
+    assert in_flight(router) == 0
+
+
+def test_hedge_budget(monkeypatch):
+    # A budget of one hedge among the last 10 requests, available from the first request
+    router, invoker = make_invoker(monkeypatch, ["endpoint-a", "endpoint-b"], max_rate=0.1, window=10)
+
+    call, calls = first_call_slow()
+    endpoint_name, result, stats = invoker.invoke("txt2nlu", call)
+    assert stats["hedged"] and not stats["hedge_suppressed"]
+
+    call, calls = first_call_slow()
+    endpoint_name, result, stats = invoker.invoke("txt2nlu", call)
+    assert result == "primary"
+    assert len(calls) == 1
+    assert stats["hedge_suppressed"] and not stats["hedged"]
+
+    # The hedge leaves the window after 10 requests
+    for _ in range(9):
+        invoker.invoke("txt2nlu", lambda endpoint_name, target_variant: "primary")
+    call, calls = first_call_slow()
+    endpoint_name, result, stats = invoker.invoke("txt2nlu", call)
+    assert stats["hedged"]
+
+
+def test_error_is_raised_when_every_call_fails(monkeypatch):
+    router, invoker = make_invoker(monkeypatch, ["endpoint-a", "endpoint-b"])
+
+    def call(endpoint_name, target_variant):
+        time.sleep(DELAY * 2)
+        raise ValueError(endpoint_name)
+
+    with pytest.raises(ValueError):
+        invoker.invoke("txt2nlu", call)
+    assert in_flight(router) == 0
+
+
+def test_single_endpoint_falls_back_to_target_variant(monkeypatch):
+    router, invoker = make_invoker(monkeypatch, ["endpoint-a"], target_variants=["AllTraffic2"])
+    call, calls = first_call_slow()
+
+    endpoint_name, result, stats = invoker.invoke("txt2nlu", call)
+
+    assert calls == [("endpoint-a", None), ("endpoint-a", "AllTraffic2")]
+    assert result == "hedge" and stats["hedge_won"]
+
+
+def test_single_endpoint_without_variants_is_not_hedged(monkeypatch):
+    router, invoker = make_invoker(monkeypatch, ["endpoint-a"])
+    call, calls = first_call_slow()
+
+    endpoint_name, result, stats = invoker.invoke("txt2nlu", call)
+
+    assert result == "primary"
+    assert len(calls) == 1 and not stats["hedged"]
+
+
+def test_hedge_delay_is_per_profile(monkeypatch):
+    router, invoker = make_invoker(monkeypatch, ["endpoint-a", "endpoint-b"])
+    for _ in range(hedging.HEDGE_MIN_SAMPLES):
+        invoker.invoke("txt2nlu", lambda endpoint_name, target_variant: "primary", profile="classification")
+
+    assert invoker.hedge_delay("txt2nlu", "classification") < DELAY
+    assert invoker.hedge_delay("txt2nlu", "summary") == DELAY
@@ -1,6 +1,10 @@
 import streamlit as st
 import os
 
+from session_metrics import track_session
+
+track_session()
+
 from PIL import Image
 image = Image.open("./img/sagemaker.png")
 st.image(image, width=80)
@@ -1,4 +1,5 @@
 import boto3
+import os
 
 region_name = boto3.Session().region_name
 
@@ -8,10 +9,20 @@ key_txt2img_sm_endpoint = "txt2img_sm_endpoint"   # this value is from Generativ
 key_txt2nlu_api_endpoint = "txt2nlu_api_endpoint" # this value is from GenerativeAiDemoWebStack
 key_txt2nlu_sm_endpoint = "txt2nlu_sm_endpoint"   # this value is from GenerativeAiTxt2nluSagemakerStack
 
+txt2img_model_name = "txt2img" # logical model names the Lambdas route to a pool of endpoints
+txt2nlu_model_name = "txt2nlu"
+
+txt2nlu_profiles = ("summary", "extraction", "classification", "free_form") # generation profiles of the txt2nlu Lambda
+
 def get_parameter(name):
     """
     This function retrieves a specific value from Systems Manager"s ParameterStore.
+    An environment variable with the upper-cased name takes precedence (see local/serve.py).
     """     
+    value = os.environ.get(name.upper())
+    if value is not None:
+        return value
+
     ssm_client = boto3.client("ssm",region_name=region_name)
     response = ssm_client.get_parameter(Name=name)
     value = response["Parameter"]["Value"]
@@ -5,6 +5,10 @@ import numpy as np
 import time
 
 from configs import *
+from request_timing import timed_post, show_timing_panel
+from session_metrics import track_session
+
+track_session()
 
 from PIL import Image
 image = Image.open("./img/sagemaker.png")
@@ -24,22 +28,28 @@ with st.spinner("Retrieving configurations..."):
         except:
             time.sleep(5)
 
-    endpoint_name = st.sidebar.text_input("SageMaker Endpoint Name:",sm_endpoint)
+    model_name = st.sidebar.text_input("Model Name:",txt2img_model_name)
+    endpoint_name = st.sidebar.text_input("SageMaker Endpoint Name (optional, bypasses routing):","",placeholder=sm_endpoint)
     url = st.sidebar.text_input("API GW Url:",api_endpoint)
+    show_timing = st.sidebar.checkbox("Show request timing")
 
 
 prompt = st.text_area("Input Image description:", """Dog in superhero outfit""")
 
 if st.button("Generate image"):
-    if endpoint_name == "" or prompt == "" or url == "":      
-        st.error("Please enter a valid endpoint name, API gateway url and prompt!")
+    if model_name == "" or prompt == "" or url == "":      
+        st.error("Please enter a valid model name, API gateway url and prompt!")
     else:
         with st.spinner("Wait for it..."):
             try:
-                r = requests.post(url,json={"prompt":prompt,"endpoint_name":endpoint_name},timeout=180)
-                data = r.json()
-                image_array = data["image"]
-                st.image(np.array(image_array))
+                data, timing = timed_post(url,{"prompt":prompt,"model":model_name,"endpoint_name":endpoint_name},timeout=180)
+                if timing["status_code"] != 200:
+                    st.error(data.get("message", f"Request failed with status {timing['status_code']}"))
+                else:
+                    image_array = data["image"]
+                    st.image(np.array(image_array))
+                    if show_timing:
+                        show_timing_panel(timing)
 
             except requests.exceptions.ConnectionError as errc:
                 st.error("Error Connecting:",errc)
@@ -3,6 +3,10 @@ import requests
 import time
 
 from configs import *
+from request_timing import timed_post, show_timing_panel, show_profile_latency
+from session_metrics import track_session
+
+track_session()
 
 from PIL import Image
 image = Image.open("./img/sagemaker.png")
@@ -43,30 +47,40 @@ with st.spinner("Retrieving configurations..."):
         except:
             time.sleep(5)
 
-    endpoint_name = st.sidebar.text_input("SageMaker Endpoint Name:",sm_endpoint)
+    model_name = st.sidebar.text_input("Model Name:",txt2nlu_model_name)
+    endpoint_name = st.sidebar.text_input("SageMaker Endpoint Name (optional, bypasses routing):","",placeholder=sm_endpoint)
     url = st.sidebar.text_input("API GW Url:",api_endpoint)
+    show_timing = st.sidebar.checkbox("Show request timing")
 
     context = st.text_area("Input Context:", conversation, height=300, max_chars=1700)
 
 
-    queries = ("write a summary",
-                "What steps were suggested to the customer to fix the issue?",
-                "What is the overall sentiment and sentiment score of the conversation?")
+    # Canned queries and the generation profile that fits each of them
+    queries = {"write a summary": "summary",
+                "What steps were suggested to the customer to fix the issue?": "extraction",
+                "What is the overall sentiment and sentiment score of the conversation?": "classification"}
 
     selection = st.selectbox(
         "Select a query:", queries)
+    selection_profile = st.selectbox(
+        "Generation profile:", txt2nlu_profiles, index=txt2nlu_profiles.index(queries[selection]), key=f"profile-{selection}")
 
     if st.button("Generate Response", key=selection):
-        if endpoint_name == "" or selection == "" or url == "":        
-            st.error("Please enter a valid endpoint name, API gateway url and prompt!")
+        if model_name == "" or selection == "" or url == "":        
+            st.error("Please enter a valid model name, API gateway url and prompt!")
         else:
             with st.spinner("Wait for it..."):
                 try:
                     prompt = f"{context}\n{selection}"
-                    r = requests.post(url,json={"prompt":prompt, "endpoint_name":endpoint_name},timeout=180)
-                    data = r.json()
-                    generated_text = data["generated_text"]
-                    st.write(generated_text)
+                    data, timing = timed_post(url,{"prompt":prompt, "model":model_name,"endpoint_name":endpoint_name,"profile":selection_profile},timeout=180)
+                    if timing["status_code"] != 200:
+                        st.error(data.get("message", f"Request failed with status {timing['status_code']}"))
+                    else:
+                        generated_text = data["generated_text"]
+                        st.write(generated_text)
+                        if show_timing:
+                            show_timing_panel(timing)
+                            show_profile_latency(selection_profile, timing)
                     #st.write(data)
                     
                 except requests.exceptions.ConnectionError as errc:
@@ -84,18 +98,25 @@ with st.spinner("Retrieving configurations..."):
             st.success("Done!")
 
     query = st.text_area("Input Query:", "what do you suggest as next step for the customer?", height=100, max_chars=60)
+    query_profile = st.selectbox(
+        "Generation profile:", txt2nlu_profiles, index=txt2nlu_profiles.index("free_form"), key="query_profile")
 
     if st.button("Generate Response", key=query):
-        if endpoint_name == "" or query == "" or url == "":        
-            st.error("Please enter a valid endpoint name, API gateway url and query!")
+        if model_name == "" or query == "" or url == "":        
+            st.error("Please enter a valid model name, API gateway url and query!")
         else:
             with st.spinner("Wait for it..."):
                 try:
                     prompt = f"{context}\n{query}"
-                    r = requests.post(url,json={"prompt":prompt, "endpoint_name":endpoint_name},timeout=180)
-                    data = r.json()
-                    generated_text = data["generated_text"]
-                    st.write(generated_text)
+                    data, timing = timed_post(url,{"prompt":prompt, "model":model_name,"endpoint_name":endpoint_name,"profile":query_profile},timeout=180)
+                    if timing["status_code"] != 200:
+                        st.error(data.get("message", f"Request failed with status {timing['status_code']}"))
+                    else:
+                        generated_text = data["generated_text"]
+                        st.write(generated_text)
+                        if show_timing:
+                            show_timing_panel(timing)
+                            show_profile_latency(query_profile, timing)
                     #st.write(data)
                     
                 except requests.exceptions.ConnectionError as errc:
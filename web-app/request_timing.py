@@ -0,0 +1,90 @@
+import time
+import uuid
+
+import requests
+import streamlit as st
+
+from session_metrics import track_request
+
+TRACE_HEADER = "X-Trace-Id"
+
+# Hops reported by the inference Lambdas in the Server-Timing response header
+hop_labels = {
+    "lambda_init": "Lambda init (cold start)",
+    "apigw_to_lambda": "API Gateway to Lambda",
+    "hedge_delay": "Wait before the hedged request",
+    "sagemaker_invoke": "SageMaker invoke (queue + inference)",
+    "sagemaker_read": "SageMaker response read",
+    "json_decode": "Lambda JSON decode",
+    "json_encode": "Lambda JSON encode",
+    "lambda_total": "Lambda handler total",
+}
+
+
+def parse_server_timing(value):
+    """
+    This function parses a Server-Timing header ("name;dur=12.3, ...") into a dict of milliseconds.
+    """
+    timings = {}
+    for entry in (value or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.startswith("dur="):
+            timings[name] = float(params[len("dur="):])
+    return timings
+
+
+def timed_post(url, payload, timeout=180):
+    """
+    This function posts a request with a new trace ID and returns the decoded response
+    together with the per-hop timings reported along the way. Check timing["status_code"]:
+    errors are returned as {"message": ...}.
+    """
+    trace_id = uuid.uuid4().hex
+
+    start = time.time()
+    with track_request():
+        r = requests.post(url, json=payload, headers={TRACE_HEADER: trace_id}, timeout=timeout)
+    round_trip = (time.time() - start) * 1000
+
+    start = time.time()
+    data = r.json()
+    decode = (time.time() - start) * 1000
+
+    timing = {
+        "status_code": r.status_code,
+        "trace_id": r.headers.get(TRACE_HEADER, trace_id),
+        "round_trip": round_trip,
+        "decode": decode,
+        "hops": parse_server_timing(r.headers.get("Server-Timing")),
+    }
+    return data, timing
+
+
+def show_profile_latency(profile, timing):
+    """
+    This function records the request's round trip under its generation profile and shows the
+    average per profile over the session, to compare the profiles' decode budgets.
+    """
+    history = st.session_state.setdefault("profile_latency", {})
+    history.setdefault(profile, []).append(timing["round_trip"])
+
+    st.table({"Profile": list(history),
+              "Requests": [len(latencies) for latencies in history.values()],
+              "Average round trip (ms)": [round(sum(latencies) / len(latencies), 1) for latencies in history.values()]})
+
+
+def show_timing_panel(timing):
+    hops = timing["hops"]
+    rows = [(hop_labels.get(name, name), duration) for name, duration in hops.items()]
+
+    # Whatever the Lambda did not account for was spent on the network and in API Gateway
+    lambda_side = hops.get("lambda_total", 0.0) + hops.get("apigw_to_lambda", 0.0) + hops.get("lambda_init", 0.0)
+    rows.append(("Network and API Gateway response", max(timing["round_trip"] - lambda_side, 0.0)))
+    rows.append(("Web app JSON decode", timing["decode"]))
+    rows.append(("Total", timing["round_trip"] + timing["decode"]))
+
+    with st.expander(f"Request timing (trace ID {timing['trace_id']})", expanded=True):
+        st.table({"Hop": [label for label, _ in rows],
+                  "Duration (ms)": [round(duration, 1) for _, duration in rows]})
+        st.caption("SageMaker does not report queueing and model latency per request, "
+                   "see the OverheadLatency and ModelLatency endpoint metrics in CloudWatch for that split.")
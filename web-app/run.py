@@ -0,0 +1,14 @@
+"""
+Starts the Streamlit application in this process after importing session_metrics, so that
+the web app metrics are published from the start of the task, before any session exists.
+The pages import the same module and report their sessions and requests to it.
+"""
+import sys
+
+from streamlit.web import cli as stcli
+
+import session_metrics  # noqa: F401, starts the metrics publisher
+
+if __name__ == "__main__":
+    sys.argv = ["streamlit", "run", "Home.py", *sys.argv[1:]]
+    sys.exit(stcli.main())
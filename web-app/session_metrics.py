@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import boto3
+import streamlit as st
+
+from configs import region_name
+
+# Set by GenerativeAiDemoWebStack, the metrics are not published when running elsewhere
+metrics_namespace = os.environ.get("METRICS_NAMESPACE")
+metrics_service = os.environ.get("METRICS_SERVICE", "WebApplication")
+
+PUBLISH_INTERVAL = int(os.environ.get("METRICS_PUBLISH_INTERVAL", "60"))  # seconds
+SESSION_IDLE_TIMEOUT = 300  # seconds without a rerun after which a session no longer counts as active
+
+_lock = threading.Lock()
+_sessions = {}
+_in_flight = 0
+_peak_in_flight = 0
+_publisher = None
+
+
+def track_session():
+    """
+    This function records activity of the current Streamlit session. Call it at the top of every page.
+    """
+    session_id = st.session_state.setdefault("metrics_session_id", uuid.uuid4().hex)
+    with _lock:
+        _sessions[session_id] = time.time()
+
+
+@contextmanager
+def track_request():
+    """
+    This context manager counts an inference request as in flight while it runs.
+    """
+    global _in_flight, _peak_in_flight
+
+    with _lock:
+        _in_flight += 1
+        _peak_in_flight = max(_peak_in_flight, _in_flight)
+    try:
+        yield
+    finally:
+        with _lock:
+            _in_flight -= 1
+
+
+def _collect():
+    global _peak_in_flight
+
+    now = time.time()
+    with _lock:
+        for session_id, last_seen in list(_sessions.items()):
+            if now - last_seen > SESSION_IDLE_TIMEOUT:
+                del _sessions[session_id]
+
+        # Report the peak rather than a point-in-time sample so that requests
+        # shorter than the publish interval are not missed
+        values = {"ActiveSessions": len(_sessions), "InFlightRequests": _peak_in_flight}
+        _peak_in_flight = _in_flight
+
+    return values
+
+
+def _publish_loop():
+    cloudwatch = boto3.client("cloudwatch", region_name=region_name)
+    while True:
+        time.sleep(PUBLISH_INTERVAL)
+        try:
+            cloudwatch.put_metric_data(
+                Namespace=metrics_namespace,
+                MetricData=[{"MetricName": name,
+                             "Dimensions": [{"Name": "Service", "Value": metrics_service}],
+                             "Value": value,
+                             "Unit": "Count"} for name, value in _collect().items()])
+        except Exception as e:
+            print(f"Failed to publish web app metrics: {e}")
+
+
+def _start_publisher():
+    global _publisher
+
+    if metrics_namespace is None:
+        return
+    with _lock:
+        if _publisher is None:
+            _publisher = threading.Thread(target=_publish_loop, name="session-metrics", daemon=True)
+            _publisher.start()
+
+
+# Started on import rather than with the first session, so that a task without
+# sessions reports 0 and can be scaled in. run.py imports this module before
+# Streamlit starts.
+_start_publisher()